@@ -14,14 +14,44 @@ Reviewers: Janice, Data
 import json
 import re
 import hashlib
+import heapq
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Tuple, Set, FrozenSet, Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache, wraps
+from itertools import repeat
 from pathlib import Path
 import math
 
 
-@dataclass
+# Semantic hash normalization: drop punctuation ([^\w\s]), collapse
+# whitespace. ASCII text (the common case) goes through str.translate
+# with an equivalent deletion table instead of a regex pass.
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_ASCII_PUNCTUATION = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if _PUNCTUATION_RE.match(c)
+))
+
+
+def _short_hash(text: str, length: int) -> str:
+    """
+    Non-cryptographic identifier of `length` hex chars.
+    
+    blake2b emits exactly the requested digest size, which beats hashing
+    with sha256 and truncating for the short strings hashed here.
+    """
+    return hashlib.blake2b(text.encode(), digest_size=length // 2).hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
 class Citation:
     """Structured citation for memory sources."""
     path: str
@@ -32,14 +62,21 @@ class Citation:
     version_hash: str
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {
+            'path': self.path,
+            'line_start': self.line_start,
+            'line_end': self.line_end,
+            'excerpt': self.excerpt,
+            'timestamp': self.timestamp,
+            'version_hash': self.version_hash
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Citation':
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class MemoryEntry:
     """Single memory entry with quality metadata."""
     content: str
@@ -52,6 +89,17 @@ class MemoryEntry:
     citation: Optional[Citation]
     tags: List[str]
     semantic_hash: str  # For conflict detection
+    # created_at as epoch seconds (None if unparseable); derived, not serialized
+    _created_epoch: Optional[float] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    def __post_init__(self):
+        # Parse once here so confidence scoring never re-parses the ISO string
+        try:
+            self._created_epoch = datetime.fromisoformat(self.created_at).timestamp()
+        except (ValueError, TypeError):
+            self._created_epoch = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -84,7 +132,7 @@ class MemoryEntry:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ConflictReport:
     """Report of conflicting memories."""
     entry_a: MemoryEntry
@@ -119,6 +167,7 @@ class ConfidenceScorer:
     
     RECENCY_DECAY_DAYS = 30  # Confidence decays over time
     ACCESS_BONUS_MAX = 0.10  # Max bonus from repeated access
+    SECONDS_PER_DAY = 86400
     
     @classmethod
     def calculate_confidence(
@@ -137,40 +186,76 @@ class ConfidenceScorer:
         
         Returns: Confidence score [0..1]
         """
-        # Base confidence from source type
-        base_confidence = cls.SOURCE_TYPE_WEIGHTS.get(
-            entry.source_type, 0.50
-        )
-        
-        # Recency factor: newer memories are more reliable
-        try:
-            created = datetime.fromisoformat(entry.created_at)
-            days_old = (datetime.now() - created).days
-            recency_factor = math.exp(-days_old / cls.RECENCY_DECAY_DAYS)
-        except (ValueError, TypeError):
-            recency_factor = 0.5  # Default if parsing fails
+        # add() never passes a relevance; skip building the one-item list
+        relevances = None if query_relevance is None else [query_relevance]
+        return cls.calculate_confidence_batch([entry], relevances)[0]
+    
+    @classmethod
+    def calculate_confidence_batch(
+        cls,
+        entries: List[MemoryEntry],
+        query_relevances: Optional[List[Optional[float]]] = None
+    ) -> List[float]:
+        """
+        Calculate confidence scores for many entries in one pass.
         
-        # Access frequency bonus (diminishing returns)
-        access_bonus = min(
-            math.log1p(entry.access_count) * 0.05,
-            cls.ACCESS_BONUS_MAX
-        )
+        This is the single implementation of the formula documented on
+        calculate_confidence. The clock is read once, constants and math
+        functions are bound to locals, and the loop body is inlined, since
+        per-call overhead dominates scoring cost.
         
-        # Citation bonus (having explicit source increases confidence)
-        citation_bonus = 0.05 if entry.citation else 0.0
+        Args:
+            entries: Entries to score
+            query_relevances: Per-entry query relevance (None = no query)
+            
+        Returns:
+            Confidence scores [0..1], in entry order
+        """
+        if query_relevances is None:
+            query_relevances = repeat(None)
         
-        # Query relevance factor (if provided)
-        relevance_factor = query_relevance if query_relevance else 1.0
+        now = time.time()
+        source_weights = cls.SOURCE_TYPE_WEIGHTS
+        seconds_per_day = cls.SECONDS_PER_DAY
+        decay_days = cls.RECENCY_DECAY_DAYS
+        access_bonus_max = cls.ACCESS_BONUS_MAX
+        exp = math.exp
+        log1p = math.log1p
         
-        # Calculate final confidence
-        confidence = (
-            base_confidence * 0.5 +
-            recency_factor * 0.3 +
-            access_bonus * 0.1 +
-            citation_bonus * 0.1
-        ) * relevance_factor
+        scores = []
+        for entry, query_relevance in zip(entries, query_relevances):
+            # Base confidence from source type
+            base_confidence = source_weights.get(entry.source_type, 0.50)
+            
+            # Recency factor: newer memories are more reliable
+            created = entry._created_epoch
+            if created is not None:
+                recency_factor = exp(-((now - created) // seconds_per_day) / decay_days)
+            else:
+                recency_factor = 0.5  # Default if parsing fails
+            
+            # Access frequency bonus (diminishing returns)
+            access_bonus = log1p(entry.access_count) * 0.05
+            if access_bonus > access_bonus_max:
+                access_bonus = access_bonus_max
+            
+            # Citation bonus (having explicit source increases confidence)
+            citation_bonus = 0.05 if entry.citation else 0.0
+            
+            # Query relevance factor (if provided)
+            relevance_factor = query_relevance if query_relevance else 1.0
+            
+            # Calculate final confidence
+            confidence = (
+                base_confidence * 0.5 +
+                recency_factor * 0.3 +
+                access_bonus * 0.1 +
+                citation_bonus * 0.1
+            ) * relevance_factor
+            
+            scores.append(round(min(max(confidence, 0.0), 1.0), 4))
         
-        return round(min(max(confidence, 0.0), 1.0), 4)
+        return scores
     
     @classmethod
     def adjust_for_conflicts(
@@ -217,22 +302,100 @@ class ConfidenceScorer:
 class ConflictDetector:
     """Detects conflicting or contradictory memories."""
     
-    CONTRADICTION_PATTERNS = [
-        # Pattern: negation flips (simplified without backref)
-        (r'\b(is|are|was|were)\b', r'\b(not\s+(is|are|was|were)|isn\'t|aren\'t|wasn\'t|weren\'t)\b'),
-        # Pattern: preference reversals
-        (r'\b(like|love|prefer)\b', r'\b(dislike|hate|avoid)\b'),
-        # Pattern: capability assertions
-        (r'\b(can|able to)\b', r'\b(can\'t|cannot|unable to)\b'),
-    ]
+    # Temporal markers (present, past, recent past, future) folded into a
+    # single alternation, compiled once at class load, so each entry is
+    # scanned in one pass
+    TEMPORAL_PATTERN = re.compile(
+        r'\b(now|currently|today)\b'
+        r'|\b(then|before|previously)\b'
+        r'|\b(yesterday|last week|last month)\b'
+        r'|\b(tomorrow|next week|soon)\b'
+    )
+    
+    # Words too common to indicate a shared subject
+    STOP_WORDS = frozenset({
+        'user', 'the', 'a', 'an', 'in', 'on', 'at', 'to', 'for', 'of', 'and', 'but'
+    })
+    
+    # Matched as whole words, so 'not' does not fire inside 'notation'
+    NEGATION_WORDS = frozenset({
+        'not', 'dislike', 'dislikes', 'disliked', 'disliking',
+        'hate', 'hates', 'hated', 'hating', 'avoid', 'avoids', 'avoided', 'avoiding',
+        "isn't", "aren't", "wasn't", "weren't",
+        "can't", "cannot", "unable", "didn't", "don't", "won't"
+    })
+    POSITIVE_WORDS = frozenset({
+        'is', 'are', 'was', 'were', 'like', 'likes', 'liked', 'liking',
+        'love', 'loves', 'loved', 'loving', 'prefer', 'prefers', 'preferred',
+        'preferring', 'can', 'able'
+    })
+    
+    # Words for polarity checks; keeps contractions like "don't" intact
+    WORD_PATTERN = re.compile(r"[\w']+")
+    
+    # Polarity flags
+    NEGATIVE = 1
+    POSITIVE = 2
+    
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def polarity(cls, content: str) -> int:
+        """
+        Polarity flags of content: NEGATIVE and/or POSITIVE if it contains
+        a negation or positive word. Memoized like tokenize().
+        """
+        words = frozenset(cls.WORD_PATTERN.findall(content.lower()))
+        flags = 0
+        if not cls.NEGATION_WORDS.isdisjoint(words):
+            flags |= cls.NEGATIVE
+        if not cls.POSITIVE_WORDS.isdisjoint(words):
+            flags |= cls.POSITIVE
+        return flags
+    
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def has_temporal_marker(cls, content: str) -> bool:
+        """Whether content contains a temporal marker. Memoized like tokenize()."""
+        return cls.TEMPORAL_PATTERN.search(content) is not None
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def tokenize(content: str) -> FrozenSet[str]:
+        """
+        Split content into the lowercased word set used for comparisons.
+        
+        Results are memoized, so identical contents share one frozenset
+        instead of being re-split on every comparison.
+        """
+        return frozenset(content.lower().split())
+    
+    # Suggested resolution per conflict type
+    RESOLUTIONS = {
+        'contradiction': 'manual_review',
+        'temporal': 'timestamp_priority',
+        'semantic': 'merge_or_clarify',
+    }
     
     @staticmethod
     def compute_semantic_hash(content: str) -> str:
         """Compute a hash for semantic comparison."""
         # Normalize content
         normalized = content.lower().strip()
-        normalized = re.sub(r'[^\w\s]', '', normalized)
-        normalized = re.sub(r'\s+', ' ', normalized)
+        if normalized.isascii():
+            normalized = normalized.translate(_ASCII_PUNCTUATION)
+        else:
+            normalized = _PUNCTUATION_RE.sub('', normalized)
+        # Collapse whitespace runs to one space; str.split() matches the
+        # same characters as \s, edge runs are kept as in re.sub(r'\s+')
+        words = normalized.split()
+        collapsed = ' '.join(words)
+        if normalized[:1].isspace():
+            collapsed = ' ' + collapsed
+        if words and normalized[-1:].isspace():
+            collapsed += ' '
+        normalized = collapsed
+        # Stays sha256: semantic hashes are persisted, and another algorithm
+        # would stop new entries matching the hashes of stored ones
         return hashlib.sha256(normalized.encode()).hexdigest()[:16]
     
     @classmethod
@@ -260,158 +423,411 @@ class ConflictDetector:
             if new_entry.path == existing.path:
                 continue
             
-            # Check for contradictions
-            contradiction = cls._check_contradiction(new_entry, existing)
-            if contradiction:
-                conflicts.append(contradiction)
-                continue
-            
-            # Check for temporal conflicts
-            temporal = cls._check_temporal_conflict(new_entry, existing)
-            if temporal:
-                conflicts.append(temporal)
+            # Exact duplicates (same normalized content) restate, not conflict
+            if new_entry.semantic_hash and new_entry.semantic_hash == existing.semantic_hash:
                 continue
             
-            # Check for semantic conflicts (same topic, different values)
-            semantic = cls._check_semantic_conflict(new_entry, existing, threshold)
-            if semantic:
-                conflicts.append(semantic)
+            conflict_type = cls.classify_pair(new_entry.content, existing.content, threshold)
+            if conflict_type:
+                conflicts.append(ConflictReport(
+                    entry_a=new_entry,
+                    entry_b=existing,
+                    conflict_type=conflict_type,
+                    confidence_delta=abs(new_entry.confidence - existing.confidence),
+                    suggested_resolution=cls.RESOLUTIONS[conflict_type]
+                ))
         
         return conflicts
     
     @classmethod
-    def _check_contradiction(
+    def classify_pair(
         cls,
-        entry_a: MemoryEntry,
-        entry_b: MemoryEntry
-    ) -> Optional[ConflictReport]:
-        """Check for direct contradictions between entries."""
-        a_content = entry_a.content.lower()
-        b_content = entry_b.content.lower()
+        content_a: str,
+        content_b: str,
+        threshold: float = 0.7
+    ) -> Optional[str]:
+        """
+        Classify the conflict between two memory contents.
         
-        # Simple negation detection
-        negation_words = ['not', 'dislike', 'hate', 'avoid', "isn't", "aren't", "wasn't", "weren't", "can't", "cannot", "unable", "didn't", "don't", "won't"]
-        positive_words = ['is', 'are', 'was', 'were', 'like', 'love', 'prefer', 'can', 'able']
+        Results are memoized per content pair, so re-checking a pair (on a
+        later add() or a store-wide sweep) is a dict lookup.
         
-        a_has_neg = any(neg in a_content for neg in negation_words)
-        b_has_neg = any(neg in b_content for neg in negation_words)
-        a_has_pos = any(pos in a_content for pos in positive_words)
-        b_has_pos = any(pos in b_content for pos in positive_words)
+        Returns:
+            'contradiction', 'temporal', 'semantic', or None
+        """
+        # Every check is symmetric, so order the pair to share memo slots
+        if content_b < content_a:
+            content_a, content_b = content_b, content_a
+        return cls._classify_pair(content_a, content_b, threshold)
+    
+    @classmethod
+    @lru_cache(maxsize=16384)
+    def _classify_pair(cls, content_a: str, content_b: str, threshold: float) -> Optional[str]:
+        """Uncached classify_pair; checks run from strongest to weakest."""
+        if cls._is_contradiction(content_a, content_b):
+            return 'contradiction'
+        if cls._is_temporal_conflict(content_a, content_b):
+            return 'temporal'
+        if cls._is_semantic_conflict(content_a, content_b, threshold):
+            return 'semantic'
+        return None
+    
+    @classmethod
+    def _is_contradiction(cls, content_a: str, content_b: str) -> bool:
+        """Check for direct contradictions between contents."""
+        # Simple negation detection
+        a_polarity = cls.polarity(content_a)
+        b_polarity = cls.polarity(content_b)
         
-        if (a_has_neg and b_has_pos) or (a_has_pos and b_has_neg):
+        if ((a_polarity & cls.NEGATIVE and b_polarity & cls.POSITIVE) or
+                (a_polarity & cls.POSITIVE and b_polarity & cls.NEGATIVE)):
             # Check if they share context (same subject)
-            a_words = set(a_content.split())
-            b_words = set(b_content.split())
-            shared_words = a_words & b_words
+            shared_words = cls.tokenize(content_a) & cls.tokenize(content_b)
             # Filter out stop words
-            stop_words = {'user', 'the', 'a', 'an', 'in', 'on', 'at', 'to', 'for', 'of', 'and', 'but'}
-            meaningful_shared = shared_words - stop_words
-            if len(meaningful_shared) >= 1:
-                return ConflictReport(
-                    entry_a=entry_a,
-                    entry_b=entry_b,
-                    conflict_type='contradiction',
-                    confidence_delta=abs(entry_a.confidence - entry_b.confidence),
-                    suggested_resolution='manual_review'
-                )
+            meaningful_shared = shared_words - cls.STOP_WORDS
+            return len(meaningful_shared) >= 1
         
-        return None
+        return False
     
     @classmethod
-    def _check_temporal_conflict(
-        cls,
-        entry_a: MemoryEntry,
-        entry_b: MemoryEntry
-    ) -> Optional[ConflictReport]:
+    def _is_temporal_conflict(cls, content_a: str, content_b: str) -> bool:
         """Check for temporal conflicts (same topic, different times)."""
-        # Extract potential subject from both entries
-        a_words = set(entry_a.content.lower().split())
-        b_words = set(entry_b.content.lower().split())
-        common_words = a_words & b_words
+        # Cheap memoized marker flags first; most pairs stop here
+        if not (cls.has_temporal_marker(content_a) and cls.has_temporal_marker(content_b)):
+            return False
         
         # High word overlap suggests same topic
-        if len(common_words) >= 3:
-            # Check for temporal markers
-            temporal_patterns = [
-                r'\b(now|currently|today)\b',
-                r'\b(then|before|previously)\b',
-                r'\b(yesterday|last week|last month)\b',
-                r'\b(tomorrow|next week|soon)\b',
-            ]
-            
-            a_has_temporal = any(re.search(p, entry_a.content) for p in temporal_patterns)
-            b_has_temporal = any(re.search(p, entry_b.content) for p in temporal_patterns)
-            
-            if a_has_temporal and b_has_temporal:
-                return ConflictReport(
-                    entry_a=entry_a,
-                    entry_b=entry_b,
-                    conflict_type='temporal',
-                    confidence_delta=abs(entry_a.confidence - entry_b.confidence),
-                    suggested_resolution='timestamp_priority'
-                )
-        
-        return None
+        common_words = cls.tokenize(content_a) & cls.tokenize(content_b)
+        return len(common_words) >= 3
     
     @classmethod
-    def _check_semantic_conflict(
-        cls,
-        entry_a: MemoryEntry,
-        entry_b: MemoryEntry,
-        threshold: float
-    ) -> Optional[ConflictReport]:
+    def _is_semantic_conflict(cls, content_a: str, content_b: str, threshold: float) -> bool:
         """Check for semantic conflicts based on content overlap."""
         # Simple semantic similarity: word overlap ratio
-        a_words = set(entry_a.content.lower().split())
-        b_words = set(entry_b.content.lower().split())
+        a_words = cls.tokenize(content_a)
+        b_words = cls.tokenize(content_b)
         
         if not a_words or not b_words:
-            return None
+            return False
+        
+        # Jaccard is at most min/max of the set sizes, so pairs of very
+        # different sizes can't exceed 0.5; skip the intersection for them
+        if 2 * min(len(a_words), len(b_words)) <= max(len(a_words), len(b_words)):
+            return False
         
         intersection = len(a_words & b_words)
-        union = len(a_words | b_words)
+        union = len(a_words) + len(b_words) - intersection
         
         similarity = intersection / union if union > 0 else 0
         
         # High similarity but different content = potential conflict
-        if 0.5 < similarity < threshold:
-            return ConflictReport(
-                entry_a=entry_a,
-                entry_b=entry_b,
-                conflict_type='semantic',
-                confidence_delta=abs(entry_a.confidence - entry_b.confidence),
-                suggested_resolution='merge_or_clarify'
-            )
-        
-        return None
+        return 0.5 < similarity < threshold
+
+
+def _locked(method):
+    """Run a MemoryStore method while holding the store's lock."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class MemoryStore:
     """Backend storage for memory with quality features."""
     
+    BUSY_TIMEOUT = 5.0  # Seconds a write waits for another connection's lock
+    CACHE_SIZE = 10_000  # Max entries held in memory; the rest stay on disk
+    QUERY_CACHE_SIZE = 256  # Max cached search candidate lists
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            id TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            path TEXT NOT NULL,
+            source_type TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            last_accessed TEXT NOT NULL,
+            access_count INTEGER NOT NULL,
+            confidence REAL NOT NULL,
+            citation_json TEXT,
+            tags_json TEXT NOT NULL,
+            semantic_hash TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_hash ON entries(semantic_hash);
+        CREATE INDEX IF NOT EXISTS ix_source ON entries(source_type);
+    """
+    
+    # Column order of `entries` rows, as produced by _entry_to_row
+    ENTRY_COLUMNS = (
+        "id, content, path, source_type, created_at, last_accessed,"
+        " access_count, confidence, citation_json, tags_json, semantic_hash"
+    )
+    
+    # Full-text index over entry content, kept in sync by triggers
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+            content, content='entries', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts(rowid, content) VALUES (new.rowid, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts(entries_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF content ON entries BEGIN
+            INSERT INTO entries_fts(entries_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+            INSERT INTO entries_fts(rowid, content) VALUES (new.rowid, new.content);
+        END;
+    """
+    
     def __init__(self, storage_path: str = ".memory_store"):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
-        self._index: Dict[str, MemoryEntry] = {}
-        self._load_index()
+        self._db = sqlite3.connect(
+            str(self.storage_path / "index.db"),
+            isolation_level=None,
+            timeout=self.BUSY_TIMEOUT,
+            # Usable from any thread; public methods hold self._lock
+            check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE must fire the delete trigger for the FTS index
+        self._db.execute("PRAGMA recursive_triggers=ON")
+        self._db.executescript(self.SCHEMA)
+        self._fts = self._create_fts_index()
+        # Closes the connection if the store is dropped without close(),
+        # or at interpreter exit
+        self._finalizer = weakref.finalize(self, self._db.close)
+        # Bounded LRU of entry objects; misses are faulted in from sqlite
+        self._cache: 'OrderedDict[str, MemoryEntry]' = OrderedDict()
+        # Token index is built on first use (see _ensure_loaded)
+        self._loaded = False
+        # Inverted index: meaningful token -> ids of entries containing it
+        self._token_index: Dict[str, Set[str]] = {}
+        self._tokens: Dict[str, FrozenSet[str]] = {}
+        # Insertion sequence number per entry, for stable candidate order
+        self._order: Dict[str, int] = {}
+        # semantic_hash -> ids, for O(1) exact-duplicate lookups
+        self._by_semantic_hash: Dict[str, Set[str]] = {}
+        # (query tokens, source filter) -> [(id, relevance)], LRU ordered;
+        # cleared on add() since any new entry may match
+        self._query_cache: 'OrderedDict[Tuple[Any, ...], List[Tuple[str, float]]]' = OrderedDict()
+        # Changes whenever another connection commits (see _sync)
+        self._data_version: Optional[int] = None
+        
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        legacy_file = self.storage_path / "index.json"
+        if count == 0 and legacy_file.exists():
+            self._import_legacy_index(legacy_file)
+    
+    def _create_fts_index(self) -> bool:
+        """
+        Create the FTS5 index, backfilling it for pre-existing stores.
+        
+        Returns:
+            False if this sqlite build lacks FTS5 (search then scans all rows)
+        """
+        existed = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'entries_fts'"
+        ).fetchone()
+        try:
+            self._db.executescript(self.FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        if not existed:
+            self._db.execute("INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')")
+        return True
+    
+    def _fts_query(self, query_words: FrozenSet[str]) -> Optional[str]:
+        """
+        Build an FTS5 MATCH expression selecting every entry that shares a
+        word with the query.
+        
+        Returns:
+            None when FTS5 can't be used and all rows must be scanned
+        """
+        if not self._fts or not query_words:
+            return None
+        # Words without letters or digits produce no FTS tokens
+        if not all(any(c.isalnum() for c in word) for word in query_words):
+            return None
+        return ' OR '.join('"' + word.replace('"', '""') + '"' for word in query_words)
+    
+    @staticmethod
+    def _entry_to_row(entry_id: str, entry: MemoryEntry) -> Tuple[Any, ...]:
+        """Flatten an entry into an `entries` table row."""
+        return (
+            entry_id,
+            entry.content,
+            entry.path,
+            entry.source_type,
+            entry.created_at,
+            entry.last_accessed,
+            entry.access_count,
+            entry.confidence,
+            json.dumps(entry.citation.to_dict()) if entry.citation else None,
+            json.dumps(entry.tags),
+            entry.semantic_hash
+        )
+    
+    @staticmethod
+    def _row_to_entry(row: Tuple[Any, ...]) -> MemoryEntry:
+        """Rebuild an entry from an `entries` table row (without the id)."""
+        (content, path, source_type, created_at, last_accessed, access_count,
+         confidence, citation_json, tags_json, semantic_hash) = row
+        # Source types and tags repeat across many rows; intern them so
+        # entries faulted in from disk share one string per distinct value
+        return MemoryEntry(
+            content=content,
+            path=path,
+            source_type=sys.intern(source_type),
+            created_at=created_at,
+            last_accessed=last_accessed,
+            access_count=access_count,
+            confidence=confidence,
+            citation=Citation.from_dict(json.loads(citation_json)) if citation_json else None,
+            tags=[sys.intern(t) if type(t) is str else t for t in json.loads(tags_json)],
+            semantic_hash=semantic_hash
+        )
     
     def _load_index(self):
-        """Load the memory index from disk."""
-        index_file = self.storage_path / "index.json"
-        if index_file.exists():
-            with open(index_file, 'r') as f:
-                data = json.load(f)
-                self._index = {
-                    k: MemoryEntry.from_dict(v) for k, v in data.items()
-                }
-    
-    def _save_index(self):
-        """Save the memory index to disk."""
-        index_file = self.storage_path / "index.json"
-        with open(index_file, 'w') as f:
-            data = {k: v.to_dict() for k, v in self._index.items()}
-            json.dump(data, f, indent=2)
+        """Build the token index from disk (entry objects load on demand)."""
+        rows = self._db.execute(
+            "SELECT id, content, semantic_hash FROM entries ORDER BY rowid"
+        )
+        for entry_id, content, semantic_hash in rows:
+            self._index_tokens(entry_id, content, semantic_hash)
+    
+    def _sync(self):
+        """
+        Discard in-memory state if another connection (e.g. another store on
+        the same path) has committed since it was built, so the token
+        indexes and cached entries never go stale.
+        """
+        (data_version,) = self._db.execute("PRAGMA data_version").fetchone()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        self._cache.clear()
+        self._query_cache.clear()
+        self._token_index.clear()
+        self._tokens.clear()
+        self._order.clear()
+        self._by_semantic_hash.clear()
+        self._loaded = False
+    
+    def _ensure_loaded(self):
+        """Load the index on first use, keeping store construction cheap."""
+        self._sync()
+        if not self._loaded:
+            self._load_index()
+            self._loaded = True
+    
+    def _entry(
+        self,
+        entry_id: str,
+        row: Optional[Tuple[Any, ...]] = None
+    ) -> Optional[MemoryEntry]:
+        """
+        Get an entry through the LRU cache, faulting it in from sqlite on a
+        miss (from `row` if the caller already selected ENTRY_COLUMNS).
+        """
+        entry = self._cache.get(entry_id)
+        if entry is not None:
+            self._cache.move_to_end(entry_id)
+            return entry
+        if row is None:
+            row = self._db.execute(
+                f"SELECT {self.ENTRY_COLUMNS} FROM entries WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if row is None:
+                return None
+        entry = self._row_to_entry(row[1:])
+        self._cache_entry(entry_id, entry)
+        return entry
     
+    def _cache_entry(self, entry_id: str, entry: MemoryEntry):
+        """Insert into the LRU cache, evicting the coldest entry if full."""
+        self._cache[entry_id] = entry
+        self._cache.move_to_end(entry_id)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def _import_legacy_index(self, index_file: Path):
+        """One-time migration of a pre-sqlite `index.json` store."""
+        with open(index_file, 'r') as f:
+            data = json.load(f)
+        self._write(
+            "INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            (self._entry_to_row(k, MemoryEntry.from_dict(v)) for k, v in data.items()),
+            many=True
+        )
+    
+    def _write(self, sql: str, params: Any, many: bool = False):
+        """
+        Run one operation's writes as a single transaction, committed
+        before returning (WAL with synchronous=NORMAL keeps commits cheap).
+        
+        BEGIN IMMEDIATE takes the write lock up front, so a concurrent
+        writer makes this wait up to BUSY_TIMEOUT instead of failing
+        mid-transaction. On any error the transaction is rolled back and
+        the error re-raised; callers update in-memory state only after
+        this returns.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if many:
+                self._db.executemany(sql, params)
+            else:
+                self._db.execute(sql, params)
+            self._db.execute("COMMIT")
+        except BaseException:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+    
+    @_locked
+    def close(self):
+        """Close the database connection."""
+        self._finalizer()
+    
+    def _index_tokens(self, entry_id: str, content: str, semantic_hash: str):
+        """Register an entry in the inverted token and semantic-hash indexes."""
+        tokens = ConflictDetector.tokenize(content)
+        self._tokens[entry_id] = tokens
+        self._order.setdefault(entry_id, len(self._order))
+        for token in tokens - ConflictDetector.STOP_WORDS:
+            self._token_index.setdefault(token, set()).add(entry_id)
+        self._by_semantic_hash.setdefault(semantic_hash, set()).add(entry_id)
+    
+    def _candidate_ids(self, tokens: FrozenSet[str], semantic_hash: str) -> List[str]:
+        """
+        Ids of entries that could conflict with content having these tokens:
+        those sharing a meaningful token, minus exact duplicates (same
+        semantic hash), oldest first.
+        """
+        candidate_ids: Set[str] = set()
+        for token in tokens - ConflictDetector.STOP_WORDS:
+            candidate_ids.update(self._token_index.get(token, ()))
+        candidate_ids -= self._by_semantic_hash.get(semantic_hash, set())
+        return sorted(candidate_ids, key=self._order.__getitem__)
+    
+    @_locked
+    def find_duplicates(self, content: str) -> List[str]:
+        """Ids of stored entries whose normalized content equals `content`'s."""
+        self._ensure_loaded()
+        semantic_hash = ConflictDetector.compute_semantic_hash(content)
+        return sorted(
+            self._by_semantic_hash.get(semantic_hash, ()), key=self._order.__getitem__
+        )
+    
+    @_locked
     def add(
         self,
         content: str,
@@ -428,6 +844,7 @@ class MemoryStore:
         Returns:
             Tuple of (created entry, list of conflicts detected)
         """
+        self._ensure_loaded()
         now = datetime.now().isoformat()
         
         # Create citation if source info provided
@@ -439,9 +856,7 @@ class MemoryStore:
                 line_end=line_end or line_start,
                 excerpt=excerpt or content[:200],
                 timestamp=now,
-                version_hash=hashlib.sha256(
-                    f"{path}:{line_start}:{content}".encode()
-                ).hexdigest()[:8]
+                version_hash=_short_hash(f"{path}:{line_start}:{content}", 8)
             )
         
         # Create entry
@@ -458,9 +873,13 @@ class MemoryStore:
             semantic_hash=ConflictDetector.compute_semantic_hash(content)
         )
         
-        # Check for conflicts
+        # Check for conflicts; only entries sharing a meaningful token with
+        # the new one can conflict, so the rest are never compared
+        candidate_ids = self._candidate_ids(
+            ConflictDetector.tokenize(content), entry.semantic_hash
+        )
         conflicts = ConflictDetector.detect_conflicts(
-            entry, list(self._index.values())
+            entry, [self._entry(i) for i in candidate_ids]
         )
         
         # Calculate confidence
@@ -471,12 +890,64 @@ class MemoryStore:
             entry.confidence = ConfidenceScorer.adjust_for_conflicts(entry, conflicts)
         
         # Store entry
-        entry_id = hashlib.sha256(f"{path}:{now}".encode()).hexdigest()[:16]
-        self._index[entry_id] = entry
-        self._save_index()
+        entry_id = _short_hash(f"{path}:{now}", 16)
+        self._write(
+            "INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            self._entry_to_row(entry_id, entry)
+        )
+        self._cache_entry(entry_id, entry)
+        self._index_tokens(entry_id, content, entry.semantic_hash)
+        self._query_cache.clear()
         
         return entry, conflicts
     
+    def _match_entries(
+        self,
+        query_words: FrozenSet[str],
+        source_filter: Optional[str]
+    ) -> List[Tuple[str, MemoryEntry, float]]:
+        """Entries relevant to the query words, with their relevance, oldest first."""
+        # Fetch candidates in sqlite (reads see the pending transaction); the
+        # full-text index narrows them to entries sharing a query word
+        match = self._fts_query(query_words)
+        sql = "SELECT e.* FROM entries e"
+        conditions: List[str] = []
+        params: List[Any] = []
+        if match is not None:
+            sql += " JOIN entries_fts ON entries_fts.rowid = e.rowid"
+            conditions.append("entries_fts MATCH ?")
+            params.append(match)
+        if source_filter:
+            conditions.append("e.source_type = ?")
+            params.append(source_filter)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        # Iterate the cursor rather than fetchall(), so rows are decoded
+        # one at a time and only relevant ones are kept
+        rows = self._db.execute(sql + " ORDER BY e.rowid", params)
+        
+        matches = []
+        for row in rows:
+            entry_id = row[0]
+            
+            # Calculate relevance score
+            entry_words = self._tokens.get(entry_id)
+            if entry_words is None:
+                # Row committed by another store on the same path since
+                # this one loaded its index
+                self._index_tokens(entry_id, row[1], row[10])
+                entry_words = self._tokens[entry_id]
+            intersection = len(query_words & entry_words)
+            union = len(query_words) + len(entry_words) - intersection
+            relevance = intersection / union if union > 0 else 0
+            
+            if relevance == 0:
+                continue
+            
+            matches.append((entry_id, self._entry(entry_id, row), relevance))
+        return matches
+    
+    @_locked
     def search(
         self,
         query: str,
@@ -490,64 +961,93 @@ class MemoryStore:
         Returns:
             Dict containing results, citations, and confidence metadata
         """
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
+        self._ensure_loaded()
+        query_words = ConflictDetector.tokenize(query)
         
-        scored_results = []
+        # Relevance depends only on the query's tokens and the stored
+        # contents, so repeated queries reuse the candidate list; confidence
+        # changes with access and is always read from the entries
+        cache_key = (query_words, source_filter)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            self._query_cache.move_to_end(cache_key)
+            matches = [
+                (entry_id, self._entry(entry_id), relevance)
+                for entry_id, relevance in cached
+            ]
+        else:
+            matches = self._match_entries(query_words, source_filter)
+            self._query_cache[cache_key] = [
+                (entry_id, relevance) for entry_id, _, relevance in matches
+            ]
+            if len(self._query_cache) > self.QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
         
-        for entry_id, entry in self._index.items():
-            # Apply filters
-            if entry.confidence < min_confidence:
-                continue
-            if source_filter and entry.source_type != source_filter:
-                continue
-            
-            # Calculate relevance score
-            entry_words = set(entry.content.lower().split())
-            intersection = len(query_words & entry_words)
-            union = len(query_words | entry_words)
-            relevance = intersection / union if union > 0 else 0
-            
-            if relevance == 0:
-                continue
-            
-            # Update entry stats
-            entry.access_count += 1
-            entry.last_accessed = datetime.now().isoformat()
-            
-            # Recalculate confidence with relevance
-            entry.confidence = ConfidenceScorer.calculate_confidence(entry, relevance)
-            
-            # Combined score: confidence * relevance
-            combined_score = entry.confidence * relevance
-            
-            scored_results.append({
-                'id': entry_id,
-                'entry': entry,
-                'relevance_score': round(relevance, 4),
-                'combined_score': round(combined_score, 4)
-            })
+        # Apply the confidence threshold, falling back to every relevant
+        # entry if none pass
+        above_threshold = [m for m in matches if m[1].confidence >= min_confidence]
         
-        # Sort by combined score
-        scored_results.sort(key=lambda x: x['combined_score'], reverse=True)
+        fallback_used = not above_threshold
+        candidates = above_threshold or matches
+        
+        # Rank by combined score: confidence (with relevance) * relevance
+        confidences = ConfidenceScorer.calculate_confidence_batch(
+            [entry for _, entry, _ in candidates],
+            [relevance for _, _, relevance in candidates]
+        )
+        # Partial selection of the top max_results; same order as a full
+        # stable sort truncated to max_results
+        ranked = heapq.nlargest(
+            max_results,
+            zip(candidates, confidences),
+            key=lambda c: round(c[1] * c[0][2], 4)
+        )
+        top = [candidate for candidate, _ in ranked]
+        
+        # Only returned entries count as accessed; their confidence is then
+        # recalculated with the updated stats, scoring all at once
+        now = datetime.now().isoformat()
+        for _, entry, _ in top:
+            entry.access_count += 1
+            entry.last_accessed = now
+        confidences = ConfidenceScorer.calculate_confidence_batch(
+            [entry for _, entry, _ in top],
+            [relevance for _, _, relevance in top]
+        )
         
-        # Build response
+        # Build response rows directly, one dict per returned entry
         results_list = []
-        for r in scored_results[:max_results]:
-            entry_dict = r['entry'].to_dict()
-            entry_dict['id'] = r['id']
-            entry_dict['relevance_score'] = r['relevance_score']
-            entry_dict['combined_score'] = r['combined_score']
+        for (entry_id, entry, relevance), confidence in zip(top, confidences):
+            entry.confidence = confidence
+            
+            entry_dict = entry.to_dict()
+            entry_dict['id'] = entry_id
+            entry_dict['relevance_score'] = round(relevance, 4)
+            # Combined score: confidence * relevance
+            entry_dict['combined_score'] = round(confidence * relevance, 4)
             results_list.append(entry_dict)
         
-        # Determine if fallback is in effect
-        fallback_used = len(results_list) == 0
-        
-        if fallback_used and min_confidence > 0:
-            # Retry with lower confidence threshold
-            return self.search(query, min_confidence=0.0, max_results=max_results)
+        # Sort by combined score
+        results_list.sort(key=lambda r: r['combined_score'], reverse=True)
         
-        self._save_index()  # Persist access count updates
+        # Persist access count updates
+        if results_list:
+            try:
+                self._write(
+                    "UPDATE entries SET access_count = ?, last_accessed = ?, confidence = ?"
+                    " WHERE id = ?",
+                    [
+                        (r['access_count'], r['last_accessed'], r['confidence'], r['id'])
+                        for r in results_list
+                    ],
+                    many=True
+                )
+            except Exception:
+                # The cached entries were already updated; drop them so
+                # they are reread from disk
+                for r in results_list:
+                    self._cache.pop(r['id'], None)
+                raise
         
         return {
             'query': query,
@@ -561,23 +1061,46 @@ class MemoryStore:
             'citations': 'auto' if any(r.get('citation') for r in results_list) else 'none'
         }
     
+    @_locked
     def get(self, entry_id: str) -> Optional[MemoryEntry]:
         """Get a specific memory entry by ID."""
-        entry = self._index.get(entry_id)
+        self._sync()
+        entry = self._entry(entry_id)
         if entry:
-            entry.access_count += 1
-            entry.last_accessed = datetime.now().isoformat()
-            self._save_index()
+            access_count = entry.access_count + 1
+            last_accessed = datetime.now().isoformat()
+            self._write(
+                "UPDATE entries SET access_count = ?, last_accessed = ? WHERE id = ?",
+                (access_count, last_accessed, entry_id)
+            )
+            entry.access_count = access_count
+            entry.last_accessed = last_accessed
         return entry
     
+    @_locked
     def get_all_conflicts(self) -> List[ConflictReport]:
         """Get all conflicts across the memory store."""
+        self._ensure_loaded()
         all_conflicts = []
-        entries = list(self._index.values())
         
-        for i, entry in enumerate(entries):
+        # Entries are faulted in through the LRU cache as each pair needs
+        # them, so the sweep never holds the whole store in memory
+        hashes = {
+            entry_id: semantic_hash
+            for semantic_hash, ids in self._by_semantic_hash.items()
+            for entry_id in ids
+        }
+        for entry_id, seq in list(self._order.items()):
+            # Only entries sharing a meaningful token can conflict, so
+            # compare against those instead of every later entry
+            later = [
+                c for c in self._candidate_ids(self._tokens[entry_id], hashes[entry_id])
+                if self._order[c] > seq
+            ]
+            if not later:
+                continue
             conflicts = ConflictDetector.detect_conflicts(
-                entry, entries[i+1:]
+                self._entry(entry_id), [self._entry(c) for c in later]
             )
             all_conflicts.extend(conflicts)
         
@@ -587,16 +1110,42 @@ class MemoryStore:
 # Global store instance (singleton pattern)
 _memory_store: Optional[MemoryStore] = None
 
+# Per-context override of the global store (see memory_store_scope)
+_store_var: ContextVar[Optional[MemoryStore]] = ContextVar('memory_store', default=None)
+
 
 def get_memory_store() -> MemoryStore:
-    """Get or create the global memory store."""
+    """Get the store for the current context, else the global memory store."""
+    store = _store_var.get()
+    if store is not None:
+        return store
     global _memory_store
     if _memory_store is None:
         _memory_store = MemoryStore()
     return _memory_store
 
 
+@contextmanager
+def memory_store_scope(store: MemoryStore) -> Iterator[MemoryStore]:
+    """
+    Make `store` what get_memory_store() returns within this block.
+    
+    The override is scoped to the current context, so concurrent threads
+    and asyncio tasks can each work against their own store.
+    """
+    token = _store_var.set(store)
+    try:
+        yield store
+    finally:
+        _store_var.reset(token)
+
+
 def reset_memory_store():
-    """Reset the memory store (for testing)."""
+    """
+    Reset the memory store (for testing).
+    
+    The old store is not closed, since callers may still hold it; its
+    connection closes once it is garbage-collected.
+    """
     global _memory_store
-    _memory_store = None
\ No newline at end of file
+    _memory_store = None
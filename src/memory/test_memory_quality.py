@@ -11,16 +11,31 @@ Author: LaForge
 Reviewers: Janice, Data
 """
 
+import gc
+import json
+import sqlite3
+import threading
 import pytest
+from dataclasses import FrozenInstanceError
 from datetime import datetime, timedelta
 from typing import List
 
+import memory_quality
 from memory_quality import (
     MemoryStore, MemoryEntry, Citation, ConflictReport,
-    ConfidenceScorer, ConflictDetector, get_memory_store, reset_memory_store
+    ConfidenceScorer, ConflictDetector, get_memory_store, memory_store_scope,
+    reset_memory_store
 )
 
 
+@pytest.fixture
+def store(tmp_path):
+    """A fresh store per test, isolated from other tests and workers."""
+    store = MemoryStore(str(tmp_path / "store"))
+    yield store
+    store.close()
+
+
 class TestConfidenceScoring:
     """Test confidence scoring algorithm [0..1]."""
     
@@ -188,6 +203,51 @@ class TestConfidenceScoring:
         cite_conf = ConfidenceScorer.calculate_confidence(cite_entry)
         
         assert cite_conf > no_cite_conf, "Cited memory should have higher confidence"
+    
+    def test_batch_matches_known_scores(self):
+        """Batch and per-entry scoring both give the formula's known values."""
+        now = datetime.now()
+        citation = Citation(
+            path="/test",
+            line_start=1,
+            line_end=1,
+            excerpt="Entry",
+            timestamp=now.isoformat(),
+            version_hash="a1b2c3d4"
+        )
+        # (source, created_at, access_count, citation, relevance)
+        cases = [
+            ('USER.md', now.isoformat(), 0, None, None),
+            ('session', (now - timedelta(days=10, hours=1)).isoformat(), 1, citation, 0.5),
+            ('inferred', (now - timedelta(days=20, hours=1)).isoformat(), 2, None, 0.25),
+            ('fallback', "not a date", 100, None, None),
+        ]
+        entries = [
+            MemoryEntry(
+                content="Entry",
+                path="/test",
+                source_type=source,
+                created_at=created_at,
+                last_accessed=now.isoformat(),
+                access_count=access_count,
+                confidence=0.0,
+                citation=entry_citation,
+                tags=[],
+                semantic_hash=""
+            )
+            for source, created_at, access_count, entry_citation, _ in cases
+        ]
+        relevances = [relevance for *_, relevance in cases]
+        
+        # (weight * 0.5 + exp(-days / 30) * 0.3 + min(log1p(access) * 0.05, 0.1) * 0.1
+        #  + citation 0.05 * 0.1) * relevance, rounded to 4 places
+        expected = [0.8, 0.3242, 0.1024, 0.36]
+        
+        assert ConfidenceScorer.calculate_confidence_batch(entries, relevances) == expected
+        assert [
+            ConfidenceScorer.calculate_confidence(e, r)
+            for e, r in zip(entries, relevances)
+        ] == expected
 
 
 class TestCitationMetadata:
@@ -211,16 +271,27 @@ class TestCitationMetadata:
         assert citation.excerpt is not None
         assert citation.timestamp is not None
         assert len(citation.version_hash) == 8
+    
+    def test_citation_is_immutable(self):
+        """Citations are frozen values and can be shared between entries."""
+        citation = Citation(
+            path="/memory/notes.md",
+            line_start=1,
+            line_end=2,
+            excerpt="Note",
+            timestamp=datetime.now().isoformat(),
+            version_hash="a1b2c3d4"
+        )
+        
+        with pytest.raises(FrozenInstanceError):
+            citation.line_start = 5
+        assert Citation.from_dict(citation.to_dict()) == citation
+        assert hash(Citation.from_dict(citation.to_dict())) == hash(citation)
 
 
 class TestConflictDetection:
     """Test conflict detection for contradictory memories."""
     
-    def setup_method(self):
-        """Reset store before each test."""
-        reset_memory_store()
-        self.store = get_memory_store()
-    
     def test_contradiction_detection(self):
         """Detect direct contradictions."""
         now = datetime.now().isoformat()
@@ -293,6 +364,37 @@ class TestConflictDetection:
         assert any(c.conflict_type == 'temporal' for c in conflicts), \
             "Should detect temporal conflict"
     
+    def test_polarity_flags(self):
+        """Negation and positive words set polarity flags."""
+        assert ConflictDetector.polarity("User dislikes cats") & ConflictDetector.NEGATIVE
+        assert ConflictDetector.polarity("User likes cats") & ConflictDetector.POSITIVE
+        assert not ConflictDetector.polarity("User likes cats") & ConflictDetector.NEGATIVE
+        # Whole words only: 'not' inside 'notation' is not a negation
+        assert not ConflictDetector.polarity("User knows notation") & ConflictDetector.NEGATIVE
+        assert ConflictDetector.polarity("User doesn't like it, not at all") & ConflictDetector.NEGATIVE
+        # Inflected forms, including -ing, count too
+        for word in ("disliking", "hating", "avoiding"):
+            assert ConflictDetector.polarity(f"User is {word} sugar") & ConflictDetector.NEGATIVE
+        for word in ("liking", "loving", "preferring"):
+            assert ConflictDetector.polarity(f"User {word} tea") == ConflictDetector.POSITIVE
+        assert ConflictDetector.classify_pair(
+            "User is avoiding sugar", "User likes sugar"
+        ) == 'contradiction'
+    
+    def test_semantic_hash_normalization(self):
+        """Case, punctuation and whitespace runs don't change the hash."""
+        h = ConflictDetector.compute_semantic_hash
+        assert h("User likes  cats!") == h("user likes cats")
+        assert h("Café — open") == h("café open")
+        assert h("User likes cats") != h("User likes dogs")
+    
+    def test_classify_pair_is_symmetric(self):
+        """Pair classification doesn't depend on argument order."""
+        a, b = "User likes cats", "User dislikes cats"
+        assert ConflictDetector.classify_pair(a, b) == 'contradiction'
+        assert ConflictDetector.classify_pair(b, a) == 'contradiction'
+        assert ConflictDetector.classify_pair(a, "Weather report") is None
+    
     def test_no_conflict_for_same_source(self):
         """Don't flag conflicts for same source path."""
         now = datetime.now().isoformat()
@@ -331,15 +433,10 @@ class TestConflictDetection:
 class TestFallbackBehavior:
     """Test transparent fallback behavior."""
     
-    def setup_method(self):
-        """Reset store before each test."""
-        reset_memory_store()
-        self.store = get_memory_store()
-    
-    def test_fallback_when_no_results(self):
+    def test_fallback_when_no_results(self, store):
         """Fallback to lower confidence when no results."""
         # Add a low confidence memory
-        self.store.add(
+        store.add(
             content="Low priority memory",
             path="/test.md",
             source_type="fallback",
@@ -347,16 +444,16 @@ class TestFallbackBehavior:
         )
         
         # Search with high confidence threshold
-        result = self.store.search("nonexistent query", min_confidence=0.99)
+        result = store.search("nonexistent query", min_confidence=0.99)
         
         # Should fallback
         assert result['fallback']['used'] is True
         assert result['fallback']['reason'] is not None
     
-    def test_no_fallback_with_results(self):
+    def test_no_fallback_with_results(self, store):
         """No fallback when results exist."""
         # Add a normal memory
-        self.store.add(
+        store.add(
             content="Test content about python",
             path="/test.md",
             source_type="USER.md",
@@ -364,16 +461,16 @@ class TestFallbackBehavior:
         )
         
         # Search
-        result = self.store.search("python", min_confidence=0.0)
+        result = store.search("python", min_confidence=0.0)
         
         # Should not fallback
         assert result['fallback']['used'] is False
         assert result['count'] > 0
     
-    def test_fallback_transparency(self):
+    def test_fallback_transparency(self, store):
         """Fallback information is transparent in response."""
         # Add a memory
-        self.store.add(
+        store.add(
             content="Test",
             path="/test.md",
             source_type="session",
@@ -381,26 +478,49 @@ class TestFallbackBehavior:
         )
         
         # Search with impossible confidence threshold
-        result = self.store.search("memory", min_confidence=1.0)
+        result = store.search("memory", min_confidence=1.0)
         
         # Verify fallback structure
         assert 'fallback' in result
         assert 'used' in result['fallback']
         assert 'reason' in result['fallback']
+    
+    def test_fallback_returns_lower_confidence_results(self, store):
+        """Fallback keeps the matches and reports the requested threshold."""
+        store.add(
+            content="Inferred note about elixir",
+            path="/e.md",
+            source_type="inferred"
+        )
+        
+        result = store.search("elixir", min_confidence=0.99)
+        
+        assert result['fallback']['used'] is True
+        assert result['count'] == 1
+        assert result['min_confidence_threshold'] == 0.99
+    
+    def test_only_returned_entries_count_as_accessed(self, store):
+        """Access stats change only for entries in the returned top-K."""
+        for i in range(3):
+            store.add(
+                content=f"Scala tip {i}",
+                path=f"/s{i}.md",
+                source_type="session"
+            )
+        
+        store.search("scala", max_results=1)
+        result = store.search("scala", max_results=3)
+        
+        assert sorted(r['access_count'] for r in result['results']) == [1, 1, 2]
 
 
 class TestMemoryStore:
     """Integration tests for MemoryStore with quality features."""
     
-    def setup_method(self):
-        """Reset store before each test."""
-        reset_memory_store()
-        self.store = get_memory_store()
-    
-    def test_add_returns_conflicts(self):
+    def test_add_returns_conflicts(self, store):
         """Adding memory returns conflict report."""
         # Add first memory
-        self.store.add(
+        store.add(
             content="User prefers tea",
             path="/user.md",
             source_type="USER.md",
@@ -408,7 +528,7 @@ class TestMemoryStore:
         )
         
         # Add conflicting memory
-        entry, conflicts = self.store.add(
+        entry, conflicts = store.add(
             content="User prefers coffee",
             path="/user.md",
             source_type="USER.md",
@@ -419,10 +539,10 @@ class TestMemoryStore:
         if conflicts:
             assert entry.confidence < 1.0
     
-    def test_search_returns_citations(self):
+    def test_search_returns_citations(self, store):
         """Search results include citation metadata."""
         # Add with citation
-        self.store.add(
+        store.add(
             content="Important fact about AI",
             path="/memory/2024-01-01.md",
             source_type="MEMORY.md",
@@ -433,7 +553,7 @@ class TestMemoryStore:
         )
         
         # Search
-        result = self.store.search("AI important", min_confidence=0.0)
+        result = store.search("AI important", min_confidence=0.0)
         
         # Response should indicate citations present
         assert 'citations' in result
@@ -442,16 +562,16 @@ class TestMemoryStore:
         for r in result['results']:
             assert 'citation' in r
     
-    def test_confidence_in_results(self):
+    def test_confidence_in_results(self, store):
         """Search results include confidence scores."""
-        self.store.add(
+        store.add(
             content="High confidence fact",
             path="/user.md",
             source_type="USER.md",
             tags=["fact"]
         )
         
-        result = self.store.search("fact", min_confidence=0.0)
+        result = store.search("fact", min_confidence=0.0)
         
         for r in result['results']:
             assert 'confidence' in r
@@ -459,10 +579,258 @@ class TestMemoryStore:
             assert 'relevance_score' in r
             assert 'combined_score' in r
     
-    def test_min_confidence_filtering(self):
+    def test_get_all_conflicts(self, store):
+        """Store-wide sweep reports conflicts between stored entries."""
+        store.add(
+            content="User likes cats",
+            path="/a.md",
+            source_type="USER.md",
+            tags=["preference"]
+        )
+        store.add(
+            content="User dislikes cats",
+            path="/b.md",
+            source_type="USER.md",
+            tags=["preference"]
+        )
+        
+        conflicts = store.get_all_conflicts()
+        
+        assert any(c.conflict_type == 'contradiction' for c in conflicts)
+    
+    def test_exact_duplicates_are_not_conflicts(self, store):
+        """Restating an entry is found as a duplicate, not a conflict."""
+        store.add(
+            content="User likes cats",
+            path="/a.md",
+            source_type="USER.md"
+        )
+        _, conflicts = store.add(
+            content="user likes cats!",
+            path="/b.md",
+            source_type="USER.md"
+        )
+        
+        assert conflicts == []
+        assert len(store.find_duplicates("User  likes cats.")) == 2
+        assert store.get_all_conflicts() == []
+    
+    def test_repeated_search_sees_new_entries(self, store):
+        """Cached query candidates are invalidated when entries are added."""
+        store.add(
+            content="First note about haskell",
+            path="/a.md",
+            source_type="MEMORY.md"
+        )
+        assert store.search("haskell")['count'] == 1
+        assert store.search("haskell")['count'] == 1
+        
+        store.add(
+            content="Second note about haskell",
+            path="/b.md",
+            source_type="MEMORY.md"
+        )
+        
+        assert store.search("haskell")['count'] == 2
+    
+    def test_memory_store_scope(self, store, tmp_path):
+        """Scoped stores override get_memory_store() and nest."""
+        other = MemoryStore(str(tmp_path / "other"))
+        with memory_store_scope(store):
+            assert get_memory_store() is store
+            with memory_store_scope(other):
+                assert get_memory_store() is other
+            assert get_memory_store() is store
+        other.close()
+    
+    def test_dropped_store_keeps_writes(self, tmp_path):
+        """Writes survive a store that is garbage-collected without close()."""
+        def use_store():
+            store = MemoryStore(str(tmp_path / "store"))
+            for path in ("/a.md", "/b.md"):
+                store.add(
+                    content=f"Note about ocaml from {path}",
+                    path=path,
+                    source_type="session"
+                )
+            store.search("ocaml")
+        
+        use_store()
+        gc.collect()
+        
+        reopened = MemoryStore(str(tmp_path / "store"))
+        result = reopened.search("ocaml")
+        
+        assert result['count'] == 2
+        assert sorted(r['access_count'] for r in result['results']) == [2, 2]
+        reopened.close()
+    
+    def test_search_from_another_thread(self, store):
+        """A store created in one thread can be searched from another."""
+        store.add(content="Note about erlang", path="/e.md", source_type="session")
+        results = []
+        
+        worker = threading.Thread(target=lambda: results.append(store.search("erlang")))
+        worker.start()
+        worker.join()
+        
+        assert results[0]['count'] == 1
+    
+    def test_reset_keeps_old_store_usable(self, tmp_path, monkeypatch):
+        """Callers still holding the previous global store can keep using it."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(memory_quality, '_memory_store', None)
+        old = get_memory_store()
+        old.add(content="Note about dart", path="/d.md", source_type="session")
+        
+        reset_memory_store()
+        
+        assert get_memory_store() is not old
+        assert old.search("dart")['count'] == 1
+        assert get_memory_store().search("dart")['count'] == 1
+    
+    def test_stores_sharing_a_path(self, tmp_path):
+        """Stores on one path can both write and see each other's entries."""
+        a = MemoryStore(str(tmp_path / "store"))
+        b = MemoryStore(str(tmp_path / "store"))
+        a.add(content="Note about rust traits", path="/a.md", source_type="session")
+        a.add(content="Note about rust lifetimes", path="/b.md", source_type="session")
+        b.add(content="Note about rust macros", path="/c.md", source_type="session")
+        
+        assert a.search("rust")['count'] == 3
+        b.add(content="Note about rust async", path="/d.md", source_type="session")
+        assert a.search("rust")['count'] == 4
+        a.close()
+        b.close()
+    
+    def test_conflicts_across_stores_sharing_a_path(self, tmp_path):
+        """Entries added by another store take part in conflict detection."""
+        a = MemoryStore(str(tmp_path / "store"))
+        b = MemoryStore(str(tmp_path / "store"))
+        a.search("cats")
+        b.add(content="User likes cats", path="/a.md", source_type="USER.md")
+        
+        _, conflicts = a.add(content="User dislikes cats", path="/b.md", source_type="USER.md")
+        
+        assert any(c.conflict_type == 'contradiction' for c in conflicts)
+        assert any(c.conflict_type == 'contradiction' for c in a.get_all_conflicts())
+        a.close()
+        b.close()
+    
+    def test_access_counts_across_stores_sharing_a_path(self, tmp_path):
+        """A store never writes back access counts another store has moved on."""
+        a = MemoryStore(str(tmp_path / "store"))
+        b = MemoryStore(str(tmp_path / "store"))
+        a.add(content="Note about julia", path="/j.md", source_type="session")
+        entry_id = a.search("julia")['results'][0]['id']
+        
+        b.get(entry_id)
+        b.get(entry_id)
+        result = a.search("julia")
+        
+        assert result['results'][0]['access_count'] == 4
+        assert b.get(entry_id).access_count == 5
+        a.close()
+        b.close()
+    
+    def test_failed_write_leaves_store_consistent(self, tmp_path, monkeypatch):
+        """A write that cannot get the lock changes nothing in memory."""
+        monkeypatch.setattr(MemoryStore, 'BUSY_TIMEOUT', 0.05)
+        store = MemoryStore(str(tmp_path / "store"))
+        store.add(content="User likes cats", path="/a.md", source_type="USER.md")
+        
+        blocker = sqlite3.connect(str(tmp_path / "store" / "index.db"), isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        with pytest.raises(sqlite3.OperationalError):
+            store.add(content="User dislikes cats", path="/b.md", source_type="USER.md")
+        blocker.execute("ROLLBACK")
+        blocker.close()
+        
+        assert store.get_all_conflicts() == []
+        assert store.search("cats")['count'] == 1
+        store.add(content="User dislikes cats", path="/b.md", source_type="USER.md")
+        assert store.search("cats")['count'] == 2
+        store.close()
+    
+    def test_non_string_tags_reload(self, tmp_path):
+        """Entries with non-string tags load back from disk unchanged."""
+        store = MemoryStore(str(tmp_path / "store"))
+        store.add(
+            content="Note about zig",
+            path="/z.md",
+            source_type="session",
+            tags=["lang", 2024]
+        )
+        store.close()
+        
+        reopened = MemoryStore(str(tmp_path / "store"))
+        result = reopened.search("zig")
+        
+        assert result['results'][0]['tags'] == ["lang", 2024]
+        reopened.close()
+    
+    def test_imports_legacy_json_index(self, tmp_path):
+        """Stores saved as index.json are migrated into sqlite on open."""
+        now = datetime.now().isoformat()
+        legacy = MemoryEntry(
+            content="Legacy fact about golang",
+            path="/legacy.md",
+            source_type="MEMORY.md",
+            created_at=now,
+            last_accessed=now,
+            access_count=0,
+            confidence=0.8,
+            citation=None,
+            tags=["legacy"],
+            semantic_hash=ConflictDetector.compute_semantic_hash("Legacy fact about golang")
+        )
+        store_dir = tmp_path / "store"
+        store_dir.mkdir()
+        (store_dir / "index.json").write_text(json.dumps({"abc": legacy.to_dict()}))
+        
+        store = MemoryStore(str(store_dir))
+        result = store.search("golang", min_confidence=0.0)
+        
+        assert result['count'] == 1
+        assert result['results'][0]['id'] == "abc"
+    
+    def test_get_before_index_load(self, tmp_path):
+        """get() on a freshly opened store reads the single entry."""
+        store = MemoryStore(str(tmp_path / "store"))
+        store.add(
+            content="Kotlin coroutines note",
+            path="/k.md",
+            source_type="session"
+        )
+        entry_id = store.search("kotlin")['results'][0]['id']
+        store.close()
+        
+        reopened = MemoryStore(str(tmp_path / "store"))
+        entry = reopened.get(entry_id)
+        
+        assert entry is not None
+        assert entry.content == "Kotlin coroutines note"
+        assert entry.access_count == 2
+        assert reopened.search("kotlin")['results'][0]['access_count'] == 3
+    
+    def test_entry_cache_is_bounded(self, store):
+        """Evicted entries stay searchable and are faulted back in."""
+        store.CACHE_SIZE = 2
+        for i in range(5):
+            store.add(
+                content=f"Haskell fact number {i}",
+                path=f"/h{i}.md",
+                source_type="session"
+            )
+        
+        assert len(store._cache) <= 2
+        assert store.search("haskell")['count'] == 5
+        assert len(store._cache) <= 2
+    
+    def test_min_confidence_filtering(self, store):
         """Respect minimum confidence threshold."""
         # Add two memories
-        self.store.add(
+        store.add(
             content="High confidence content",
             path="/user.md",
             source_type="USER.md",
@@ -470,7 +838,7 @@ class TestMemoryStore:
         )
         
         # Search with high threshold
-        result = self.store.search("content", min_confidence=0.9)
+        result = store.search("content", min_confidence=0.9)
         
         for r in result['results']:
             assert r['confidence'] >= 0.9